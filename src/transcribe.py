@@ -1,39 +1,238 @@
 
 import argparse
+import asyncio
+import functools
+import mimetypes
+import mmap
+import re
 import sys
 import os
+import threading
 import time
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
 
 from google.cloud import storage
+from google.cloud.storage.retry import DEFAULT_RETRY
+try:
+    from google.cloud.storage import transfer_manager
+except ImportError:
+    # Older google-cloud-storage without transfer_manager support
+    transfer_manager = None
 import vertexai
 from vertexai.generative_models import GenerativeModel, Part, SafetySetting
-from transliterate import translit
 
-def upload_to_gcs(bucket_name: str, source_file_path: str, destination_blob_name: str) -> str:
+# Ukrainian -> Latin transliteration as a plain translation table. The
+# mapping is fixed, so a single C-level str.translate pass replaces the
+# regex-driven transliterate library (and drops the runtime dependency).
+_UK_LATIN_MAP = {
+    "а": "a", "б": "b", "в": "v", "г": "h", "ґ": "g", "д": "d", "е": "e",
+    "є": "ye", "ж": "zh", "з": "z", "и": "y", "і": "i", "ї": "yi", "й": "j",
+    "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r",
+    "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch",
+    "ш": "sh", "щ": "shch", "ь": "", "ю": "yu", "я": "ya", "'": "", "’": "",
+}
+# Uppercase Cyrillic maps to the same lowercase Latin, folding the
+# lowercasing into the same translate pass.
+_UK_LATIN_MAP.update({k.upper(): v for k, v in list(_UK_LATIN_MAP.items()) if k.upper() != k})
+_UK_LATIN = str.maketrans(_UK_LATIN_MAP)
+
+# Files below this size are uploaded in one shot; the compose overhead of a
+# chunked upload isn't worth it for small payloads.
+PARALLEL_UPLOAD_THRESHOLD = 32 * 1024 * 1024
+
+# Files this small are read once into memory (mmap) and uploaded in a single
+# shot, skipping the uploader's extra pass over the filesystem.
+SMALL_UPLOAD_THRESHOLD = 16 * 1024 * 1024
+
+# Flush stdout once every N streamed chunks rather than per chunk.
+FLUSH_EVERY = 8
+
+# Serializes generate calls on the shared model/client handle when
+# transcribing a batch of files.
+_MODEL_LOCK = threading.Lock()
+
+# Chunks longer than this get re-chunked in --smooth mode.
+_SMOOTH_MIN_CHUNK = 50
+
+def _echo_chunk(text_chunk: str, index: int, smooth: bool = False) -> None:
+    """Writes a streamed chunk to stdout.
+
+    Vertex often coalesces output into "mega-chunks" that land all at once,
+    making the stream look frozen and then dump a wall of text. In smooth
+    mode, long chunks are replayed in 4-char slices with a 20 ms spacing —
+    total wall time is unchanged, but the TTY keeps moving. The sinks always
+    receive the original chunk either way.
+    """
+    if smooth and len(text_chunk) > _SMOOTH_MIN_CHUNK:
+        for i in range(0, len(text_chunk), 4):
+            sys.stdout.write(text_chunk[i:i + 4])
+            sys.stdout.flush()
+            time.sleep(0.02)
+        return
+    sys.stdout.write(text_chunk)
+    if index % FLUSH_EVERY == 0:
+        sys.stdout.flush()
+
+def guess_video_mime(file_path: str) -> str:
+    """Guesses the video mime type from the filename, defaulting to MP4."""
+    return mimetypes.guess_type(file_path)[0] or "video/mp4"
+
+@functools.lru_cache(maxsize=1)
+def _get_storage_client() -> storage.Client:
+    """Returns a shared storage client.
+
+    Building a fresh Client per call redoes credential discovery, token
+    exchange and the TLS handshake every time; caching one keeps the
+    authorized session (and its keep-alive sockets) warm across helpers.
+    """
+    client = storage.Client()
+    try:
+        from requests.adapters import HTTPAdapter
+        # Widen the connection pool so parallel chunk uploads don't queue
+        # behind the default pool size.
+        client._http.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+    except Exception:
+        pass  # Transport internals changed or requests missing; defaults are fine.
+    return client
+
+@functools.lru_cache(maxsize=8)
+def _bucket(bucket_name: str) -> storage.Bucket:
+    """Returns a cached Bucket handle for the shared client.
+
+    Bucket construction re-validates the name each time; with the client
+    already cached, caching the handle too makes repeat helper calls free.
+    """
+    return _get_storage_client().bucket(bucket_name)
+
+def _content_fingerprint(file_path: str) -> str:
+    """Cheap content fingerprint: CRC32C over the first and last MiB plus size.
+
+    Stable across re-runs of the same file, so staging blob names are
+    content-addressed and an already-uploaded video can be reused instead of
+    being uploaded again.
+    """
+    size = os.path.getsize(file_path)
+    window = 1024 * 1024
+    with open(file_path, "rb") as f:
+        head = f.read(window)
+        tail = b""
+        if size > window:
+            f.seek(max(size - window, window))
+            tail = f.read(window)
+    try:
+        import google_crc32c
+        crc = google_crc32c.Checksum(head)
+        crc.update(tail)
+        value = int.from_bytes(crc.digest(), "big")
+    except ImportError:
+        import zlib
+        value = zlib.crc32(tail, zlib.crc32(head))
+    return f"{value:08x}-{size:x}"
+
+def upload_to_gcs(bucket_name: str, source_file_path: str, destination_blob_name: str,
+                  content_type: Optional[str] = None) -> str:
     """Uploads a file to the bucket."""
-    print(f"Uploading {source_file_path} to gs://{bucket_name}/{destination_blob_name} ...")
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
+    bucket = _bucket(bucket_name)
     blob = bucket.blob(destination_blob_name)
-    blob.upload_from_filename(source_file_path)
+    # Blob names are content-addressed, so an existing object is the same
+    # bytes — skip the upload entirely on a re-run.
+    try:
+        if blob.exists():
+            print(f"Reusing already-uploaded gs://{bucket_name}/{destination_blob_name}")
+            return f"gs://{bucket_name}/{destination_blob_name}"
+    except Exception:
+        pass  # If the HEAD fails we just upload as usual.
+    print(f"Uploading {source_file_path} to gs://{bucket_name}/{destination_blob_name} ...")
+    content_type = content_type or guess_video_mime(source_file_path)
+    file_size = os.path.getsize(source_file_path)
+    if transfer_manager is not None and file_size >= PARALLEL_UPLOAD_THRESHOLD:
+        # Large videos: split into byte-range chunks and stream them in parallel.
+        # A single TCP stream tops out around ~200 MiB/s; parallel connections
+        # get past that, so this is a big win for the multi-GB case.
+        blob.content_type = content_type
+        transfer_manager.upload_chunks_concurrently(
+            source_file_path,
+            blob,
+            chunk_size=PARALLEL_UPLOAD_THRESHOLD,
+            max_workers=8,
+            deadline=None,
+        )
+    elif 0 < file_size < SMALL_UPLOAD_THRESHOLD:
+        # Small clips: map the file into memory and upload in one shot,
+        # avoiding the chunked uploader's second read pass over the disk.
+        with open(source_file_path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                blob.upload_from_file(mm, content_type=content_type, size=file_size,
+                                      checksum="crc32c")
+    else:
+        # 64 MiB resumable chunks (a multiple of the required 256 KiB) keep
+        # the single TCP stream busy long enough to reach the uplink's
+        # bandwidth-delay product instead of stalling between 8 MiB rounds.
+        blob.chunk_size = 64 * 1024 * 1024
+        # crc32c instead of the default md5: the google-crc32c C extension
+        # uses the hardware CRC instructions, so integrity checking no longer
+        # serializes a full-file hash on the CPU before the bytes move.
+        # Generous timeouts/deadline suit multi-hundred-MB videos on slow links.
+        blob.upload_from_filename(
+            source_file_path,
+            content_type=content_type,
+            checksum="crc32c",
+            retry=DEFAULT_RETRY.with_deadline(600),
+            timeout=(10, 600),
+        )
     print(f"File uploaded to gs://{bucket_name}/{destination_blob_name}")
     return f"gs://{bucket_name}/{destination_blob_name}"
 
+# Marker file listing buckets we've already verified/created, so repeat runs
+# skip the exists() HEAD request entirely.
+_KNOWN_BUCKETS_FILE = os.path.join(
+    os.path.expanduser("~"), ".cache", "gemini-transcriber", "known_buckets"
+)
+
+def _is_known_bucket(bucket_name: str) -> bool:
+    try:
+        with open(_KNOWN_BUCKETS_FILE, "r", encoding="utf-8") as f:
+            return bucket_name in f.read().split()
+    except OSError:
+        return False
+
+def _remember_bucket(bucket_name: str) -> None:
+    try:
+        os.makedirs(os.path.dirname(_KNOWN_BUCKETS_FILE), exist_ok=True)
+        with open(_KNOWN_BUCKETS_FILE, "a", encoding="utf-8") as f:
+            f.write(f"{bucket_name}\n")
+    except OSError:
+        pass  # Cache is best-effort; worst case we re-check next run.
+
+@functools.lru_cache(maxsize=None)
 def ensure_bucket(bucket_name: str, location: str) -> None:
     """
     Ensures a bucket exists. Creates it if not.
+
+    Memoized in-process, and backed by a local marker file so steady-state
+    runs skip the exists() RPC altogether.
     """
-    storage_client = storage.Client()
+    if _is_known_bucket(bucket_name):
+        print(f"Using existing bucket: {bucket_name} (cached)")
+        return
     try:
-        bucket = storage_client.bucket(bucket_name)
+        bucket = _bucket(bucket_name)
         if not bucket.exists():
             print(f"Bucket {bucket_name} not found. Creating in {location}...")
             # Location is important for data residence
             bucket.create(location=location)
+            # Auto-abort stale multipart uploads left behind if a parallel
+            # chunked upload is interrupted, so partial chunks don't linger.
+            try:
+                bucket.add_lifecycle_abort_incomplete_multipart_upload_rule(age=1)
+                bucket.patch()
+            except Exception as lifecycle_err:
+                print(f"Warning: Could not set lifecycle rule on {bucket_name}: {lifecycle_err}")
             print(f"Created bucket: {bucket_name}")
         else:
             print(f"Using existing bucket: {bucket_name}")
+        _remember_bucket(bucket_name)
     except Exception as e:
         print(f"Warning: Issue checking/creating bucket {bucket_name}: {e}")
         print("Falling back to attempt straightforward usage...")
@@ -54,38 +253,69 @@ def get_output_bucket_name(project_id: str) -> str:
 
 def upload_text_to_gcs(bucket_name: str, destination_blob_name: str, text_content: str) -> str:
     """Uploads text content to GCS."""
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
+    bucket = _bucket(bucket_name)
     blob = bucket.blob(destination_blob_name)
     blob.upload_from_string(text_content)
     return f"gs://{bucket_name}/{destination_blob_name}"
 
+def _delete_blob_in_background(bucket_name: str, blob_name: str) -> None:
+    """Dispatches a blob delete to a daemon thread.
+
+    Joins the thread at interpreter exit (with a short timeout) so the
+    DELETE usually completes, but the CLI doesn't sit on the RPC after the
+    transcript has already been delivered.
+    """
+    import atexit
+
+    thread = threading.Thread(target=delete_blob, args=(bucket_name, blob_name), daemon=True)
+    thread.start()
+    atexit.register(thread.join, 5)
+
+def open_text_blob_writer(bucket_name: str, destination_blob_name: str):
+    """Opens a streaming text writer to a GCS blob (resumable upload)."""
+    bucket = _bucket(bucket_name)
+    blob = bucket.blob(destination_blob_name)
+    return blob.open("w", encoding="utf-8")
+
 def delete_blob(bucket_name: str, blob_name: str):
     """Deletes a blob from the bucket."""
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
+    bucket = _bucket(bucket_name)
     blob = bucket.blob(blob_name)
     blob.delete()
     print(f"Blob {blob_name} deleted.")
 
+def build_vertex_model(project_id: str, location: str, model_name: str) -> GenerativeModel:
+    """Initializes Vertex AI and constructs the model handle.
+
+    Split out from transcription so it can run concurrently with the GCS
+    upload — the init/auth RPCs here are independent of the file transfer.
+    """
+    print(f"Initializing Vertex AI with project={project_id}, location={location}")
+    try:
+        # Prefer gRPC: streamed tokens arrive as framed protobuf instead of
+        # JSON/SSE, which is far lighter on the wire and gives proper
+        # incremental chunk boundaries.
+        import grpc  # noqa: F401
+        vertexai.init(project=project_id, location=location, api_transport="grpc")
+    except ImportError:
+        # grpcio not installed; REST still works, just chattier.
+        vertexai.init(project=project_id, location=location)
+    print(f"Loading model {model_name}...")
+    return GenerativeModel(model_name)
+
 def transcribe_video(
-    project_id: str,
-    location: str,
-    model_name: str,
+    model: GenerativeModel,
     gcs_uri: str,
-    prompt_text: str = "Transcribe the audio from this video, paying special attention to Ukrainian speech. Provide the output as pure text."
+    sink: Optional[Callable[[str], None]] = None,
+    prompt_text: str = "Transcribe the audio from this video, paying special attention to Ukrainian speech. Provide the output as pure text.",
+    mime_type: str = "video/mp4",
+    smooth: bool = False
 ) -> str:
     """Transcribes video using Gemini."""
-    print(f"Initializing Vertex AI with project={project_id}, location={location}")
-    vertexai.init(project=project_id, location=location)
-
-    print(f"Loading model {model_name}...")
-    model = GenerativeModel(model_name)
-
     print("Generating content...")
     video_part = Part.from_uri(
         uri=gcs_uri,
-        mime_type="video/mp4", # Assuming MP4 for simplicity, or we could detect
+        mime_type=mime_type,
     )
 
     responses = model.generate_content(
@@ -93,18 +323,50 @@ def transcribe_video(
         stream=True,
     )
 
-    full_text = ""
-    for response in responses:
+    # With a sink, each chunk is handed off as it arrives and nothing
+    # accumulates here — the transcript can be many MB for long videos.
+    # Without one, fall back to buffering and returning the full text.
+    parts: list[str] = []
+    consume = sink if sink is not None else parts.append
+    for i, response in enumerate(responses):
         text_chunk = response.text
-        print(text_chunk, end="", flush=True)
-        full_text += text_chunk
-    
+        _echo_chunk(text_chunk, i, smooth)
+        consume(text_chunk)
+
     print("\n")
-    return full_text
+    return "".join(parts)
+
 
+def _gcloud_config_value(section: str, option: str) -> Optional[str]:
+    """Reads a value straight from the local gcloud config file.
+
+    Forking the gcloud CLI costs hundreds of ms of interpreter startup; the
+    config is just an INI file, so parse it in-process instead.
+    """
+    import configparser
+    config_dir = os.environ.get(
+        "CLOUDSDK_CONFIG",
+        os.path.join(os.path.expanduser("~"), ".config", "gcloud"),
+    )
+    config_name = "default"
+    try:
+        with open(os.path.join(config_dir, "active_config"), "r", encoding="utf-8") as f:
+            config_name = f.read().strip() or "default"
+    except OSError:
+        pass
+    parser = configparser.ConfigParser()
+    try:
+        parser.read(os.path.join(config_dir, "configurations", f"config_{config_name}"))
+        return parser.get(section, option, fallback=None)
+    except (OSError, configparser.Error):
+        return None
 
 def get_gcloud_region() -> Optional[str]:
-    """Attempts to get the region from gcloud config."""
+    """Attempts to get the region from the environment or gcloud config."""
+    region = os.environ.get("CLOUDSDK_COMPUTE_REGION") or _gcloud_config_value("compute", "region")
+    if region:
+        return region
+    # Last resort: shell out to gcloud (slow, but matches its view exactly).
     try:
         import subprocess
         result = subprocess.run(
@@ -120,40 +382,34 @@ def get_gcloud_region() -> Optional[str]:
         pass
     return None
 
+# Anything that isn't a safe filename character collapses to one underscore.
+_SANITIZE_RE = re.compile(r"[^a-z0-9._-]+")
+
 def sanitize_filename(filename: str) -> str:
     """
     Sanitizes the filename:
     1. Transliterates Cyrillic to Latin.
     2. Lowercases.
-    3. Replaces spaces with underscores.
+    3. Collapses spaces, punctuation and anything else unsafe to underscores.
     """
     # Basename without extension
     name, ext = os.path.splitext(filename)
-    
-    # Transliterate (Ukrainian/Russian to Latin)
-    try:
-        from transliterate import translit
-        name = translit(name, 'uk', reversed=True)
-    except Exception:
-        pass # Fallback if language not detected or other issue
 
-    # Lowercase
-    name = name.lower()
-    
-    # Replace spaces with underscores
-    name = name.replace(" ", "_")
-    
+    # Transliterate (Ukrainian to Latin) — one translate pass, already lowercased
+    name = name.translate(_UK_LATIN)
+
+    # One regex pass handles spaces, parentheses, emoji and other shell-hostile
+    # characters that used to slip through.
+    name = _SANITIZE_RE.sub("_", name.lower()).strip("_")
+
     return f"{name}.txt"
 
-def transcribe_video_genai(
-    api_key: str,
-    project_id: str,
-    location: str,
-    gcs_uri: str,
-    model_name: str,
-    prompt_text: str
-) -> str:
-    """Transcribes video using the new Google GenAI SDK (Vertex AI backend)."""
+def build_genai_client(api_key: str, project_id: str, location: str):
+    """Constructs the GenAI client (Vertex AI backend).
+
+    Like build_vertex_model, kept separate so client construction can overlap
+    with the GCS upload.
+    """
     # Import here to avoid global dependency if not installed yet (though we enforce it now)
     from google import genai
     from google.genai import types
@@ -161,22 +417,45 @@ def transcribe_video_genai(
     print(f"Initializing GenAI Client for Vertex AI (Project: {project_id}, Location: {location})...")
     # Note: Vertex AI usually relies on ADC credentials, but user provided an API Key.
     # The user's sample uses api_key=... and vertexai=True.
-    
+
     # SDK ValueErr: Project/location and API key are mutually exclusive
-    client = genai.Client(
+    return genai.Client(
         vertexai=True,
-        api_key=api_key
+        api_key=api_key,
+        # The genai SDK is REST-only; at least ask for gzipped responses so
+        # streamed chunks cost fewer bytes on the wire. Don't pin api_version:
+        # the SDK defaults Vertex to v1beta1, where preview models
+        # (--preview / gemini-3-pro-preview) are served.
+        http_options=types.HttpOptions(
+            headers={"accept-encoding": "gzip"},
+        ),
     )
 
+async def transcribe_video_genai(
+    client,
+    gcs_uri: str,
+    model_name: str,
+    prompt_text: str,
+    sink: Optional[Callable[[str], None]] = None,
+    mime_type: str = "video/mp4",
+    smooth: bool = False
+) -> str:
+    """Transcribes video using the new Google GenAI SDK (Vertex AI backend).
+
+    Uses the async client (client.aio) so the thread isn't pinned on
+    blocking socket reads between chunks.
+    """
+    from google.genai import types
+
     print(f"Loading model {model_name}...")
-    
+
     # Create the video part from GCS URI
     # The new SDK might have a specific way, but Part.from_uri is standard for Vertex
     # In google-genai, it's types.Part.from_uri(...)
-    
+
     video_part = types.Part.from_uri(
         file_uri=gcs_uri,
-        mime_type="video/mp4"
+        mime_type=mime_type
     )
     
     text_part = types.Part.from_text(text=prompt_text)
@@ -196,52 +475,63 @@ def transcribe_video_genai(
         max_output_tokens=8192,
     )
 
-    responses = client.models.generate_content_stream(
+    responses = await client.aio.models.generate_content_stream(
         model=model_name,
         contents=contents,
         config=generate_content_config,
     )
 
-    full_text = ""
-    for chunk in responses:
+    # Same sink hand-off / batched flushing as transcribe_video.
+    parts: list[str] = []
+    consume = sink if sink is not None else parts.append
+    i = 0
+    async for chunk in responses:
         if chunk.text:
-            print(chunk.text, end="", flush=True)
-            full_text += chunk.text
+            _echo_chunk(chunk.text, i, smooth)
+            consume(chunk.text)
+            i += 1
     print("\n")
-    return full_text
+    return "".join(parts)
 
 def main():
     # Detect default region
     default_region = get_gcloud_region() or "us-central1"
     
     parser = argparse.ArgumentParser(description="Transcribe video using Gemini 3 Pro via Vertex AI.")
-    parser.add_argument("file_path", help="Path to the local video file. Recommended to be in workspace/input/")
+    parser.add_argument("file_path", nargs="+", help="Path(s) to local video file(s). Recommended to be in workspace/input/")
     parser.add_argument("--bucket", help="Google Cloud Storage bucket name for temporary file staging. If not provided, one will be auto-created.")
     parser.add_argument("--project", help="Google Cloud Project ID. Optional if configured in gcloud.")
     parser.add_argument("--location", default=default_region, help=f"Google Cloud Region (default: {default_region}).")
     parser.add_argument("--model", default="gemini-2.5-pro", help="Gemini model version (default: gemini-2.5-pro).")
     parser.add_argument("--preview", action="store_true", help="Use Gemini 3 Pro Preview model (shorthand for --model gemini-3-pro-preview).")
     parser.add_argument("--keep-gcs", action="store_true", help="If set, skip deleting the file from GCS after processing.")
+    parser.add_argument("--cleanup", action="store_true", help="Delete the staged video from GCS after processing (default: keep it).")
     parser.add_argument("--api-key", help="API Key for Vertex AI / Gemini. Required for Gemini 3 Preview if using API Key auth.")
+    parser.add_argument("--smooth", action="store_true", help="Replay large streamed chunks gradually in the terminal instead of dumping them at once.")
 
     args = parser.parse_args()
     
     if args.preview:
         args.model = "gemini-3-pro-preview"
 
-    if not os.path.exists(args.file_path):
-        print(f"Error: File '{args.file_path}' not found.")
-        sys.exit(1)
+    for file_path in args.file_path:
+        if not os.path.exists(file_path):
+            print(f"Error: File '{file_path}' not found.")
+            sys.exit(1)
 
-    # Infer project ID
+    # Infer project ID: env var and the gcloud config file are free to read,
+    # google.auth is in-process, and forking gcloud is the last resort only.
     project_id = args.project
+    if not project_id:
+        project_id = os.environ.get("GOOGLE_CLOUD_PROJECT") or _gcloud_config_value("core", "project")
+
     if not project_id:
         try:
             import google.auth
             _, project_id = google.auth.default()
         except:
             pass
-    
+
     if not project_id:
          try:
              import subprocess
@@ -263,76 +553,129 @@ def main():
         bucket_name = get_output_bucket_name(project_id)
         ensure_bucket(bucket_name, args.location)
     
-    file_name = os.path.basename(args.file_path)
-    # Store inputs in inputs/ folder
-    blob_name = f"inputs/{int(time.time())}_{file_name}"
-    
-    # Upload first (required for Vertex AI, even with new SDK for large files)
-    try:
-        gcs_uri = upload_to_gcs(bucket_name, args.file_path, blob_name)
-    except Exception as e:
-         print(f"Error uploading to GCS: {e}")
-         print(f"Check if you have permissions or if the bucket '{bucket_name}' exists.")
-         sys.exit(1)
-
-    # Transcribe
-    try:
+    # Bootstrap the client/model exactly once for the whole batch — the
+    # token-exchange + handle construction is pure overhead per extra file.
+    # Kicking it off in a worker thread lets it overlap with the first
+    # file's upload, which runs in the main thread below.
+    with ThreadPoolExecutor(max_workers=1) as executor:
         if args.api_key:
-             # Use new SDK path
-             transcription_text = transcribe_video_genai(
-                api_key=args.api_key,
-                project_id=project_id,
-                location=args.location,
-                gcs_uri=gcs_uri,
-                model_name=args.model,
-                prompt_text="Transcribe the audio from this video, paying special attention to Ukrainian speech. Provide the output as pure text."
-             )
+            bootstrap_future = executor.submit(build_genai_client, args.api_key, project_id, args.location)
         else:
-             # Standard Vertex Path
-             transcription_text = transcribe_video(
-                project_id=project_id,
-                location=args.location,
-                model_name=args.model,
-                gcs_uri=gcs_uri
-            )
-        
-        output_filename = sanitize_filename(file_name)
-        
-        # 1. Save to Local Output
-        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        local_output_dir = os.path.join(project_root, "workspace", "output")
-        if not os.path.exists(local_output_dir):
+            bootstrap_future = executor.submit(build_vertex_model, project_id, args.location, args.model)
+
+        model_or_client = None
+        # One event loop for the whole batch: the genai client's pooled
+        # keep-alive connections are bound to the loop they were created
+        # under, so a fresh asyncio.run per file would hand file #2 sockets
+        # from an already-closed loop.
+        genai_loop = asyncio.new_event_loop() if args.api_key else None
+        for file_path in args.file_path:
+            file_name = os.path.basename(file_path)
+            # Store inputs in inputs/ folder, keyed by content fingerprint
+            # rather than timestamp: two runs in the same second no longer
+            # collide, and re-running the same file reuses the staged blob.
+            blob_name = f"inputs/{_content_fingerprint(file_path)}_{file_name}"
+            # Detect mime once per file; the upload and the Vertex request both
+            # need it, and hardcoding video/mp4 made Vertex reject other containers.
+            mime_type = guess_video_mime(file_path)
+
+            try:
+                gcs_uri = upload_to_gcs(bucket_name, file_path, blob_name, mime_type)
+            except Exception as e:
+                print(f"Error uploading to GCS: {e}")
+                print(f"Check if you have permissions or if the bucket '{bucket_name}' exists.")
+                sys.exit(1)
+
+            if model_or_client is None:
+                try:
+                    model_or_client = bootstrap_future.result()
+                except Exception as e:
+                    print(f"Error initializing Vertex AI: {e}")
+                    sys.exit(1)
+
+            # Output destinations, resolved up front so chunks can stream into them.
+            output_filename = sanitize_filename(file_name)
+            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            local_output_dir = os.path.join(project_root, "workspace", "output")
             os.makedirs(local_output_dir, exist_ok=True)
-            
-        local_output_path = os.path.join(local_output_dir, output_filename)
-        with open(local_output_path, "w", encoding="utf-8") as f:
-            f.write(transcription_text)
-        print(f"\n[Local] Output saved to: {local_output_path}")
-        
-        # 2. Save to GCS Output
-        try:
-             # Store outputs in outputs/ folder
-             gcs_output_path = f"outputs/{output_filename}"
-             gcs_output_uri = upload_text_to_gcs(bucket_name, gcs_output_path, transcription_text)
-             print(f"[GCS] Output uploaded to: {gcs_output_uri}")
-        except Exception as e:
-             print(f"Warning: Failed to upload output to GCS: {e}")
+            local_output_path = os.path.join(local_output_dir, output_filename)
+            # Store outputs in outputs/ folder
+            gcs_output_path = f"outputs/{output_filename}"
 
-    except Exception as e:
-        print(f"\nAn error occurred during transcription: {e}")
-        import traceback
-        traceback.print_exc()
-        sys.exit(1)
-        
-    # Cleanup Logic - Changed to PERSISTENT by default
-    # If user explicity wants to cleanup, they can... but we'll remove the auto-delete for now as requested.
-    # To re-enable cleanup, we could add a --cleanup flag, but for now we just respect the persistence.
-    if args.keep_gcs:
-        print(f"File kept in GCS: gs://{bucket_name}/{blob_name}")
-    else:
-        # Default behavior update: Keep file.
-        # Use simple print to inform.
-        print(f"Video file preserved in GCS: gs://{bucket_name}/{blob_name}")
+            # Transcribe, streaming every chunk straight into the local file and a
+            # resumable GCS writer instead of buffering the whole transcript in RAM
+            # and writing it out at the end.
+            try:
+                local_file = open(local_output_path, "w", encoding="utf-8")
+                try:
+                    gcs_writer = open_text_blob_writer(bucket_name, gcs_output_path)
+                except Exception as e:
+                    print(f"Warning: Could not open GCS output writer: {e}")
+                    gcs_writer = None
+
+                def sink(text_chunk: str) -> None:
+                    local_file.write(text_chunk)
+                    if gcs_writer is not None:
+                        gcs_writer.write(text_chunk)
+
+                try:
+                    # The shared handle isn't documented as thread-safe, so
+                    # serialize generate calls on it.
+                    with _MODEL_LOCK:
+                        if args.api_key:
+                             # Use new SDK path (async client under the hood)
+                             genai_loop.run_until_complete(transcribe_video_genai(
+                                client=model_or_client,
+                                gcs_uri=gcs_uri,
+                                model_name=args.model,
+                                prompt_text="Transcribe the audio from this video, paying special attention to Ukrainian speech. Provide the output as pure text.",
+                                sink=sink,
+                                mime_type=mime_type,
+                                smooth=args.smooth
+                             ))
+                        else:
+                             # Standard Vertex Path
+                             transcribe_video(
+                                model=model_or_client,
+                                gcs_uri=gcs_uri,
+                                sink=sink,
+                                mime_type=mime_type,
+                                smooth=args.smooth
+                            )
+                finally:
+                    local_file.close()
+
+                print(f"\n[Local] Output saved to: {local_output_path}")
+                if gcs_writer is not None:
+                    try:
+                        # Closing commits the resumable upload.
+                        gcs_writer.close()
+                        print(f"[GCS] Output uploaded to: gs://{bucket_name}/{gcs_output_path}")
+                    except Exception as e:
+                        print(f"Warning: Failed to upload output to GCS: {e}")
+
+            except Exception as e:
+                print(f"\nAn error occurred during transcription: {e}")
+                import traceback
+                traceback.print_exc()
+                sys.exit(1)
+
+            # Cleanup Logic - PERSISTENT by default; --cleanup opts into deletion.
+            if args.cleanup and not args.keep_gcs:
+                # The user already has the transcript at this point, so don't block
+                # the exit on a synchronous DELETE round-trip: fire it on a daemon
+                # thread and give it a bounded grace period at interpreter exit.
+                _delete_blob_in_background(bucket_name, blob_name)
+            elif args.keep_gcs:
+                print(f"File kept in GCS: gs://{bucket_name}/{blob_name}")
+            else:
+                # Default behavior update: Keep file.
+                # Use simple print to inform.
+                print(f"Video file preserved in GCS: gs://{bucket_name}/{blob_name}")
+
+        # Batch done; error paths above exit the process, so no try/finally.
+        if genai_loop is not None:
+            genai_loop.close()
 
 if __name__ == "__main__":
     main()